@@ -1,7 +1,10 @@
 import argparse
-import difflib
+import concurrent.futures
+import contextlib
+import filecmp
 import functools
 import io
+import operator
 import os
 import pathlib
 import platform
@@ -10,8 +13,8 @@ import shutil
 import subprocess
 import sys
 
-from packaging.version import Version
-from portage import output, colorize
+from packaging.version import InvalidVersion, Version
+from portage import output
 
 __version__ = "0.1"
 
@@ -21,19 +24,48 @@ jobs = "4"
 # gentoo's fancy terminal output functions
 out = output.EOutput()
 out.print = lambda s: print(s) if not out.quiet else None
-out.green = lambda s: colorize("green", s if isinstance(s, str) else str(s))
-out.red = lambda s: colorize("red", s if isinstance(s, str) else str(s))
-out.teal = lambda s: colorize("teal", s if isinstance(s, str) else str(s))
+
+def _colorizer (color: str):
+    """Get a function wrapping its argument in a given color's escape codes."""
+    # escape codes, looked up on first use (loads portage's color.map)
+    codes = None
+    def colorize (s):
+        nonlocal codes
+        if not output.havecolor:
+            return str(s)
+        if codes is None:
+            codes = output.codes[color], output.codes["reset"]
+        return f"{codes[0]}{s}{codes[1]}"
+    return colorize
+
+out.green = _colorizer("green")
+out.red = _colorizer("red")
+out.teal = _colorizer("teal")
 
 # disable colorization for pipes and redirects
 if not sys.stdout.isatty():
     output.havecolor = 0
 
+# kernel version (e.g. linux-5.15.1-gentoo-r1)
+_VERSION_RE = re.compile(r"(\d+\.\d+\.\d+)-gentoo(-\w+\d+)?")
+
+# boot entry number, label and image (e.g. Boot0001* Gentoo\tHD()/\EFI\...)
+_ENTRY_RE = re.compile(
+    r"Boot([0-9A-F]{4})\*? ([^\t]+)\t(?:.*?/\\(EFI\\.*?\.efi))?"
+)
+
+# config option (e.g. CONFIG_DEBUG_INFO=y)
+_CONFIG_RE = re.compile(r"(CONFIG_[^=]+)=(.*)")
+
+# block device and partition number (e.g. /dev/sda1 or /dev/nvme0n1p1)
+_DEV_RE = re.compile(r"(.+?)(?:(?<=\d)p)?(\d+)")
+
+@functools.lru_cache(maxsize=None)
 def version (string: str):
     """Extract the version from a given string."""
     return Version("".join(filter(
         None,
-        re.search(r"(\d+.\d+.\d+)-gentoo(-\w+\d+)?", string).groups()
+        _VERSION_RE.search(string).groups()
     )))
 
 class Kernel:
@@ -52,15 +84,39 @@ class Kernel:
         self.src = pathlib.Path(src)
         if not self.src.exists():
             raise ValueError(f"error: missing source {src}")
+        self._parse()
+
+    @classmethod
+    def _trusted (cls, src):
+        """Construct a Kernel from a source path known to exist."""
+        kernel = cls.__new__(cls)
+        kernel.src = pathlib.Path(src)
+        kernel._parse()
+        return kernel
+
+    def _parse (self):
+        """Derive version and module directory from the source path."""
         try:
             self.version = version(self.src.name)
         except Exception as e:
-            raise ValueError(f"error: illegal source {src}") from e
-        self.config = self.src / ".config"
-        self.bzImage = self.src / "arch/x86_64/boot/bzImage"
-        self.bkp = efi.img.parent / f"gentoo-{self.version.base_version}.efi"
+            raise ValueError(f"error: illegal source {self.src}") from e
         self.modules = self.modules / f"{self.version.base_version}-gentoo"
 
+    @functools.cached_property
+    def config (self):
+        """Path to the kernel config."""
+        return self.src / ".config"
+
+    @functools.cached_property
+    def bzImage (self):
+        """Path to the kernel image."""
+        return self.src / "arch/x86_64/boot/bzImage"
+
+    @functools.cached_property
+    def bkp (self):
+        """Path to the backup boot image on the ESP."""
+        return efi.img.parent / f"gentoo-{self.version.base_version}.efi"
+
     def __eq__ (self, other):
         if not isinstance(other, Kernel):
             return False
@@ -84,11 +140,12 @@ class Kernel:
     @classmethod
     def list (cls, descending=True):
         """Get an descending list of available kernels."""
-        return list(sorted(
-            (Kernel(src) for src in cls.src.glob("linux-*")),
-            key=lambda k: k.version,
-            reverse=descending
-        ))
+        return list(_list_kernels(cls.src, descending))
+
+    @classmethod
+    def _invalidate (cls):
+        """Forget cached kernel lists after changes to the source directory."""
+        _list_kernels.cache_clear()
 
     @classmethod
     def current (cls):
@@ -98,7 +155,10 @@ class Kernel:
         Returns:
             Kernel: the current kernel, pointed to by ``/usr/src/linux``
         """
-        return cls(Kernel.linux.resolve())
+        try:
+            return cls(cls.linux.parent / os.readlink(cls.linux))
+        except OSError as e:
+            raise ValueError(f"error: missing source {cls.linux}") from e
 
     @classmethod
     def latest (cls):
@@ -110,6 +170,40 @@ class Kernel:
         """
         return cls.list()[0]
 
+def _scan (
+    path: pathlib.Path,
+    prefix: str,
+    suffix: str = "",
+    dirs: bool = False
+):
+    """List the entries of a directory matching a given prefix and suffix."""
+    with os.scandir(path) as it:
+        return [
+            pathlib.Path(e.path)
+            for e in it
+            if e.name.startswith(prefix) and e.name.endswith(suffix)
+            and (not dirs or e.is_dir(follow_symlinks=False))
+        ]
+
+def _scan_versions (path: pathlib.Path, prefix: str, suffix: str):
+    """List entries named ``<prefix><version><suffix>``, newest first."""
+    def key (p):
+        try:
+            v = Version(p.name[len(prefix):len(p.name) - len(suffix)])
+        except InvalidVersion:
+            v = Version("0")
+        return v, p.name
+    return sorted(_scan(path, prefix, suffix), key=key, reverse=True)
+
+@functools.lru_cache(maxsize=2)
+def _list_kernels (src: pathlib.Path, descending: bool):
+    """Get a sorted tuple of kernels found in a given source directory."""
+    return tuple(sorted(
+        (Kernel._trusted(d) for d in _scan(src, "linux-", dirs=True)),
+        key=operator.attrgetter("version"),
+        reverse=descending
+    ))
+
 def cli (f):
     """A top level exception handling decorator for script main functions."""
     @functools.wraps(f)
@@ -122,91 +216,164 @@ def cli (f):
             sys.exit(1)
     return handler
 
-def efi (f):
-    """Decorator locating and mounting ESP through efivars."""
-    efi.skip = False
-    # boot partition
-    efi.esp = pathlib.Path("/boot")
-    # boot image
-    efi.img = efi.esp / "EFI/Gentoo/bootx64.efi"
-    # backup entry data
-    efi.bkp = {}
-    # analyze boot entries and ensure access to the currently running image
-    @functools.wraps(f)
-    def locator (*args, **kwargs):
-        if efi.skip:
-            return f(*args, **kwargs)
-        efi.skip = True
+class EFI:
+    """Locates and mounts ESP through efivars."""
+
+    __slots__ = ("skip", "esp", "img", "bkp", "entries", "label")
+
+    def __init__ (self):
+        self.skip = False
+        # boot partition
+        self.esp = pathlib.Path("/boot")
+        # boot image
+        self.img = self.esp / "EFI/Gentoo/bootx64.efi"
+        # backup entry data
+        self.bkp = {}
+        # boot entries (number → label, image)
+        self.entries = {}
+        # label of the currently running entry
+        self.label = None
+
+    def __call__ (self, f):
+        """Decorator ensuring access to the currently running image."""
+        @functools.wraps(f)
+        def locator (*args, **kwargs):
+            with self.mount():
+                return f(*args, **kwargs)
+        return locator
+
+    @contextlib.contextmanager
+    def mount (self):
+        """Context manager ensuring access to the currently running image."""
+        if self.skip:
+            yield
+            return
+        self.skip = True
+        try:
+            mounted = self._locate()
+            try:
+                yield
+            finally:
+                # umount esp
+                if mounted:
+                    subprocess.run(["umount", str(self.esp)], check=True)
+        finally:
+            self.skip = False
+
+    def _locate (self):
+        """Analyze boot entries and mount ESP (returns True if mounted)."""
         # get boot entries
         mgr = subprocess.run(
             ["efibootmgr"],
             capture_output=True,
-            check=True
+            check=True,
+            text=True
         )
-        lines = mgr.stdout.decode().splitlines()
-        num = "NaN"
-        for l in lines:
+        num = None
+        self.entries = {}
+        for l in mgr.stdout.splitlines():
             if l.startswith("BootCurrent"):
                 num = l[13:17]
-                break
+            elif m := _ENTRY_RE.match(l):
+                n, label, img = m.groups()
+                if img: img = pathlib.Path(img.replace("\\", "/"))
+                self.entries[n] = (label, img)
         # find currently running entry/image
-        def loader (line, start=9):
-            i = line.find("/\\EFI", start)
-            if i < 0: raise RuntimeError(f"error: missing boot image:\n{line}")
-            i += 1
-            j = line.find(".efi", i) + 4
-            return pathlib.Path(l[i:j].replace("\\", "/"))
-        for l in lines:
-            if l.startswith(f"Boot{num}"):
-                i = l.find(" ") + 1
-                j = l.find("\t", i)
-                efi.label = l[i:j]
-                efi.bkp["label"] = f"{efi.label} (fallback)"
-                img = loader(l, j)
-                break
+        if num not in self.entries or not self.entries[num][1]:
+            raise RuntimeError(f"error: missing boot image of Boot{num}")
+        self.label, img = self.entries[num]
         # find fallback entry/image
-        for l in lines:
-            if efi.bkp["label"] in l:
-                efi.bkp["num"] = l[4:8]
-                efi.bkp["img"] = loader(l)
+        self.bkp = {"label": f"{self.label} (fallback)"}
+        for n, (label, path) in self.entries.items():
+            if label == self.bkp["label"] and path:
+                self.bkp["num"] = n
+                self.bkp["img"] = self.esp / path
                 break
         # mount esp
         mounted = False
-        if not efi.img.exists():
+        if not self.img.exists():
             # find mountpoint
-            for l in pathlib.Path("/etc/fstab").read_text().splitlines():
-                if not l.startswith("#"):
-                    for p in ["/boot", "/efi"]:
-                        if p in l:
-                            # update paths
-                            efi.esp = pathlib.Path(p)
-                            efi.img = efi.esp / img
-                            if efi.bkp and "img" in efi.bkp:
-                                efi.bkp["img"] = efi.bkp["img"]
-                            break
-                    else: continue
-                    break
-            else: raise RuntimeError("error: missing mountpoint of ESP")
+            with open("/etc/fstab") as fstab:
+                for l in fstab:
+                    fields = l.split()
+                    # skip empty lines and (indented) comments
+                    if not fields or fields[0].startswith("#"):
+                        continue
+                    if len(fields) > 1 and fields[1] in {"/boot", "/efi"}:
+                        # update paths
+                        self.esp = pathlib.Path(fields[1])
+                        self.img = self.esp / img
+                        if "num" in self.bkp:
+                            self.bkp["img"] = (
+                                self.esp / self.entries[self.bkp["num"]][1]
+                            )
+                        # kernel backup images moved along
+                        Kernel._invalidate()
+                        break
+                else: raise RuntimeError("error: missing mountpoint of ESP")
             try:
                 subprocess.run(
-                    ["mount", str(efi.esp)],
+                    ["mount", str(self.esp)],
                     capture_output=True,
-                    check=True
+                    check=True,
+                    text=True
                 )
                 mounted = True
             except subprocess.CalledProcessError as e:
-                msg = e.stderr.decode().strip()
-                if f"already mounted on {efi.esp}" not in msg:
-                    raise RuntimeError(e.stderr.decode().splitlines()[0])
-        assert efi.img.exists()
-        try:
-            return f(*args, **kwargs)
-        finally:
-            efi.skip = False
-            # umount esp
-            if mounted:
-                subprocess.run(["umount", str(efi.esp)], check=True)
-    return locator
+                msg = e.stderr.strip()
+                if f"already mounted on {self.esp}" not in msg:
+                    raise RuntimeError(msg.splitlines()[0])
+        assert self.img.exists()
+        return mounted
+
+# locate and mount ESP
+efi = EFI()
+
+# command line arguments shared between commands
+_jobs = argparse.ArgumentParser(add_help=False)
+_jobs.add_argument(
+    "-j",
+    metavar="<jobs>",
+    dest="jobs",
+    type=int,
+    default=int(jobs),
+    help=f"number of parallel make jobs (default: {jobs})"
+)
+_source = argparse.ArgumentParser(add_help=False)
+_source.add_argument(
+    "-s",
+    metavar="<src>",
+    dest="src",
+    type=pathlib.Path,
+    help="kernel source directory (default: latest)"
+)
+_quiet = argparse.ArgumentParser(add_help=False)
+_quiet.add_argument(
+    "-q",
+    dest="quiet",
+    action="store_true",
+    help="be quiet"
+)
+
+# ekernel-configure command line arguments
+_configure_parser = argparse.ArgumentParser(
+    prog="ekernel-configure",
+    description="Configure a kernel.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_source, _quiet]
+)
+_configure_parser.add_argument(
+    "-l",
+    dest="list",
+    action="store_true",
+    help="print newly added config options and exit"
+)
+_configure_parser.add_argument(
+    "-d",
+    dest="delete",
+    action="store_true",
+    help="delete config (perform a fresh install / reconfigure)"
+)
 
 @cli
 def configure (argv):
@@ -250,43 +417,17 @@ def configure (argv):
       else
         cp -n ${old}/.config ${new}
         cd ${new}
-        make listnewconfig > .newoptions
-        make oldconfig || exit
+        make listnewconfig > .newoptions || exit
+        if [[ -s .newoptions ]]
+        then
+          make oldconfig || exit
+        else
+          cp ${old}/.config .config.old
+        fi
       fi
     """
-    parser = argparse.ArgumentParser(
-        prog="ekernel-configure",
-        description="Configure a kernel.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-l",
-        dest="list",
-        action="store_true",
-        help="print newly added config options and exit"
-    )
-    parser.add_argument(
-        "-d",
-        dest="delete",
-        action="store_true",
-        help="delete config (perform a fresh install / reconfigure)"
-    )
-    parser.add_argument(
-        "-s",
-        metavar="<src>",
-        dest="src",
-        type=pathlib.Path,
-        default=Kernel.latest().src,
-        help="kernel source directory (default: latest)"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
-    kernel = Kernel(args.src)
+    args = _configure_parser.parse_args(argv)
+    kernel = Kernel(args.src) if args.src else Kernel.latest()
     out.quiet = args.quiet
     newoptions = kernel.src / ".newoptions"
 
@@ -311,14 +452,26 @@ def configure (argv):
         shutil.copy(oldconfig, kernel.config)
         # store newly added options
         out.einfo(f"running {out.teal('make listnewconfig')}")
-        make = subprocess.run(["make", "listnewconfig"], capture_output=True)
-        newoptions.write_text("\n".join(
-            l for l in make.stdout.decode().splitlines() if "=" in l
-        ))
+        make = subprocess.run(
+            ["make", "listnewconfig"],
+            capture_output=True,
+            check=True,
+            text=True
+        )
+        options = [l for l in make.stdout.splitlines() if "=" in l]
+        tmp = newoptions.with_suffix(".tmp")
+        tmp.write_text("\n".join(options))
+        os.replace(tmp, newoptions)
         # configure
-        if not args.list:
+        if not args.list and options:
             out.einfo(f"running {out.teal('make oldconfig')}")
             subprocess.run(["make", "oldconfig"], check=True)
+        # nothing to configure: keep the backup make oldconfig would create
+        elif not args.list:
+            out.einfo(
+                f"skipping {out.teal('make oldconfig')} (no new options)"
+            )
+            shutil.copy(oldconfig, kernel.src / ".config.old")
     # make menuconfig
     elif not args.list:
         out.einfo(f"running {out.teal('make menuconfig')}")
@@ -328,9 +481,17 @@ def configure (argv):
     if args.list:
         if not newoptions.exists():
             raise FileNotFoundError(f"error: missing {newoptions}")
-        for l in newoptions.read_text().splitlines():
-            opt, val = l.split("=", maxsplit=1)
-            out.print(f"{opt} = {val}")
+        with newoptions.open() as f:
+            for m in filter(None, map(_CONFIG_RE.match, f)):
+                out.print(f"{m[1]} = {m[2]}")
+
+# ekernel-build command line arguments
+_build_parser = argparse.ArgumentParser(
+    prog="ekernel-build",
+    description="Build a kernel.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_jobs, _source, _quiet]
+)
 
 @cli
 def build (argv):
@@ -339,7 +500,7 @@ def build (argv):
     ===============
 
     Build the latest kernel found in ``/usr/src`` or any other by supplying
-    a source directory and install it's modules.
+    a source directory.
 
     Command Line Arguments
     ----------------------
@@ -361,37 +522,10 @@ def build (argv):
     This command is a mere wrapper to::
 
       cd ${new}
-      make -k ${jobs} && make modules_install
+      make -j ${jobs}
     """
-    parser = argparse.ArgumentParser(
-        prog="ekernel-build",
-        description="Build a kernel.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-j",
-        metavar="<jobs>",
-        dest="jobs",
-        type=int,
-        default=int(jobs),
-        help=f"number of parallel make jobs (default: {jobs})"
-    )
-    parser.add_argument(
-        "-s",
-        metavar="<src>",
-        dest="src",
-        type=pathlib.Path,
-        default=Kernel.latest().src,
-        help="kernel source directory (default: latest)"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
-    kernel = Kernel(args.src)
+    args = _build_parser.parse_args(argv)
+    kernel = Kernel(args.src) if args.src else Kernel.latest()
     out.quiet = args.quiet
 
     # check if config exists
@@ -401,10 +535,37 @@ def build (argv):
     # build
     os.chdir(kernel.src)
     out.einfo(f"building {out.teal(kernel.src)}")
-    margs = ["make", "-j", str(args.jobs)]
-    if args.quiet:
-        margs.append(">/dev/null")
-    subprocess.run(margs, check=True)
+    subprocess.run(
+        ["make", "-j", str(args.jobs)],
+        check=True,
+        stdout=subprocess.DEVNULL if args.quiet else None
+    )
+
+def _copy_image (src: pathlib.Path, img: pathlib.Path, bkp: pathlib.Path):
+    """Atomically replace a boot image and copy it to a given backup."""
+    # never leave a partial boot image (or its temporary copy) behind
+    tmp = img.with_suffix(".tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, img)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    shutil.copyfile(img, bkp)
+
+# ekernel-install command line arguments
+_install_parser = argparse.ArgumentParser(
+    prog="ekernel-install",
+    description="Install a kernel.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_jobs, _source, _quiet]
+)
+_install_parser.add_argument(
+    "-b",
+    dest="bkp",
+    action="store_true",
+    help="create fallback boot entry"
+)
 
 @cli
 @efi
@@ -422,6 +583,9 @@ def install (argv):
     ``-b``
       create fallback boot entry (default: false)
 
+    ``-j <jobs>``
+      number of parallel make jobs (default: 4)
+
     ``-s <src>``
       kernel source directory (default: latest)
 
@@ -437,74 +601,69 @@ def install (argv):
 
     This command is a mere wrapper to::
 
-      eselect kernel set $(basename ${src})
       mount /boot
+      eselect kernel set $(basename ${src})
       esp=/boot/EFI/Gentoo
       cp ${src}/arch/x86_64/boot/bzImage ${esp}/bootx64.efi
       cp ${src}/arch/x86_64/boot/bzImage ${esp}/gentoo-${version}.efi
+      make -j ${jobs} modules_install
     """
-    parser = argparse.ArgumentParser(
-        prog="ekernel-install",
-        description="Install a kernel.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-b",
-        dest="bkp",
-        action="store_true",
-        help="create fallback boot entry"
-    )
-    parser.add_argument(
-        "-s",
-        metavar="<src>",
-        dest="src",
-        type=pathlib.Path,
-        default=Kernel.latest().src,
-        help="kernel source directory (default: latest)"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
-    kernel = Kernel(args.src)
+    args = _install_parser.parse_args(argv)
+    kernel = Kernel(args.src) if args.src else Kernel.latest()
     out.quiet = args.quiet
 
-    # store running image for latter comparison
+    # find the currently running kernel's backup image before it's replaced
     if args.bkp:
-        boot_bytes = efi.img.read_bytes()
+        for bkp in efi.img.parent.glob("gentoo*.efi"):
+            if filecmp.cmp(efi.img, bkp, shallow=False):
+                break
+        # not found
+        else:
+            name = f"gentoo-{version(platform.release()).base_version}.efi"
+            bkp = efi.img.parent / name
+            shutil.copy(efi.img, bkp)
 
     # check if bzImage exists
     if not kernel.bzImage.exists():
         raise FileNotFoundError(f"error: missing bzImage {kernel.bzImage}")
 
-    # update symlink to the new source directory
-    out.einfo(
-        "updating symlink "
-        f"{out.teal(kernel.linux)} → {out.teal(kernel.src)}"
-    )
-    subprocess.run(
-        ["eselect", "kernel", "set", kernel.src.name],
-        check=True
-    )
+    # the following steps are independent of each other
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = []
 
-    # copy boot image
-    out.einfo(f"creating boot image {out.teal(efi.img)}")
-    shutil.copy(kernel.bzImage, efi.img)
+        # update symlink to the new source directory
+        out.einfo(
+            "updating symlink "
+            f"{out.teal(kernel.linux)} → {out.teal(kernel.src)}"
+        )
+        futures.append(executor.submit(
+            subprocess.run,
+            ["eselect", "kernel", "set", kernel.src.name],
+            check=True
+        ))
 
-    # create backup
-    out.einfo(f"creating backup image {out.teal(kernel.bkp)}")
-    shutil.copy(kernel.bzImage, kernel.bkp)
+        # copy boot image and create the backup from the installed image
+        out.einfo(f"creating boot image {out.teal(efi.img)}")
+        out.einfo(f"creating backup image {out.teal(kernel.bkp)}")
+        futures.append(executor.submit(
+            _copy_image,
+            kernel.bzImage,
+            efi.img,
+            kernel.bkp
+        ))
+
+        # propagate errors
+        for future in futures:
+            future.result()
 
     # install modules
     os.chdir(kernel.src)
     out.einfo(f"installing modules {out.teal(kernel.modules)}")
-    margs = ["make", "modules_install"]
-    if args.quiet:
-        margs.append(">/dev/null")
-    subprocess.run(margs, check=True)
+    subprocess.run(
+        ["make", "-j", str(args.jobs), "modules_install"],
+        check=True,
+        stdout=subprocess.DEVNULL if args.quiet else None
+    )
 
     # rebuild external modules
     eargs = ["emerge", "@module-rebuild"]
@@ -515,25 +674,14 @@ def install (argv):
 
     # create fallback boot entry
     if args.bkp:
-        # path to backup image
-        bkp = None
-        # find the currently running kernel's backup image
-        for f in efi.img.parent.glob("gentoo*.efi"):
-            if f.read_bytes() == boot_bytes:
-                bkp = f
-                break
-        # not found
-        else:
-            name = f"gentoo-{version(platform.release()).base_version}.efi"
-            bkp = efi.img.parent / name
-            shutil.copy(efi.img, bkp)
         # get ESP disk and partition number
         dev = subprocess.run(
             ["findmnt", "-rno", "SOURCE", str(efi.esp)],
             capture_output=True,
-            check=True
+            check=True,
+            text=True
         )
-        disk, part = re.search(r"([/a-z]+)(\d+)", dev.stdout.decode()).groups()
+        disk, part = _DEV_RE.fullmatch(dev.stdout.strip()).groups()
         # remove previous entry
         if "num" in efi.bkp:
             out.einfo(f"deleting boot entry {out.teal(efi.bkp['label'])}")
@@ -556,6 +704,28 @@ def install (argv):
         ], check=True)
         efi.bkp["img"] = bkp
 
+# ekernel-clean command line arguments
+_clean_parser = argparse.ArgumentParser(
+    prog="ekernel-clean",
+    description="Remove unused kernel leftovers.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_quiet]
+)
+_clean_parser.add_argument(
+    "-k",
+    metavar="<keep>",
+    dest="keep",
+    type=int,
+    default=2,
+    help="keep the newest <num> bootable kernels (default: 2)"
+)
+_clean_parser.add_argument(
+    "-n",
+    dest="dry",
+    action="store_true",
+    help="perform a dry run (show what would be removed)"
+)
+
 @cli
 @efi
 def clean (argv):
@@ -581,56 +751,38 @@ def clean (argv):
       be quiet
 
     """
-    parser = argparse.ArgumentParser(
-        prog="ekernel-clean",
-        description="Remove unused kernel leftovers.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-k",
-        metavar="<keep>",
-        dest="keep",
-        type=int,
-        default=2,
-        help="keep the newest <num> bootable kernels (default: 2)"
-    )
-    parser.add_argument(
-        "-n",
-        dest="dry",
-        action="store_true",
-        help="perform a dry run (show what would be removed)"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
+    args = _clean_parser.parse_args(argv)
     out.quiet = args.quiet
     if args.keep < 1:
         raise ValueError("error: at least one bootable kernel must be kept")
 
+    # installed modules and boot images
+    modules = _scan_versions(Kernel.modules, "", "-gentoo")
+    images = _scan_versions(efi.img.parent, "gentoo-", ".efi")
+    bootable = set(modules).union(images)
+
     # retained kernels
+    kernels = Kernel.list()
     keep = {"kernels": []}
-    for k in Kernel.list():
-        if args.keep and k.bootable():
-            args.keep -= 1
+    for k in kernels:
+        if len(keep["kernels"]) == args.keep:
+            break
+        if {k.modules, k.bkp} <= bootable:
             keep["kernels"].append(k)
 
     # collect sources
     keep["sources"] = {k.src for k in keep["kernels"]}
     rm = {"sources": [
-        d
-        for d in Kernel.src.glob("linux-*")
-        if d not in keep["sources"]
+        k.src
+        for k in kernels
+        if k.src not in keep["sources"]
     ]}
 
     # collect modules
     keep["modules"] = {k.modules for k in keep["kernels"]}
     rm["modules"] = [
         d
-        for d in Kernel.modules.glob("*-gentoo")
+        for d in modules
         if d not in keep["modules"]
     ]
 
@@ -638,7 +790,7 @@ def clean (argv):
     keep["images"] = {k.bkp for k in keep["kernels"]}
     rm["images"] = [
         f
-        for f in efi.img.parent.glob("gentoo-*")
+        for f in images
         if f not in keep["images"]
     ]
 
@@ -650,17 +802,25 @@ def clean (argv):
         out.einfo(f"running {out.teal(' '.join(eargs))}")
         subprocess.run(eargs, check=True)
 
-    # remove files
-    for k, v in rm.items():
-        if v:
-            out.einfo(f"deleting {k}:")
-        for p in v:
-            out.print(f"   {out.red('✗')} {out.teal(p)}")
-            if args.dry: continue
-            if p.is_dir():
-                shutil.rmtree(p)
-            else:
-                p.unlink()
+    # remove files (concurrently, since deleting source trees is I/O bound)
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = []
+        for k, v in rm.items():
+            if v:
+                out.einfo(f"deleting {k}:")
+            for p in v:
+                out.print(f"   {out.red('✗')} {out.teal(p)}")
+                if args.dry: continue
+                if p.is_dir():
+                    futures.append(executor.submit(shutil.rmtree, p))
+                else:
+                    futures.append(executor.submit(p.unlink))
+
+        # propagate errors
+        for future in futures:
+            future.result()
+    if not args.dry:
+        Kernel._invalidate()
 
     # remove defunct fallback boot entry
     if efi.bkp and "img" in efi.bkp:
@@ -675,6 +835,28 @@ def clean (argv):
                     "-B"
                 ], check=True)
 
+# ekernel-commit command line arguments
+_commit_parser = argparse.ArgumentParser(
+    prog="ekernel-commit",
+    description="Commit the current kernel config.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_quiet]
+)
+_commit_parser.add_argument(
+    "-m",
+    metavar="<msg>",
+    dest="msg",
+    type=str,
+    default="",
+    help="additional information for the commit message"
+)
+_commit_parser.add_argument(
+    "-n",
+    dest="dry",
+    action="store_true",
+    help="perform a dry run (show what would be commited)"
+)
+
 @cli
 def commit (argv):
     """
@@ -703,26 +885,33 @@ def commit (argv):
     """
     msg = io.StringIO()
 
-    def git (argv: list[str]):
+    def git (argv: list[str], **kwargs):
         """Run git, capture output and check exit code."""
-        return subprocess.run(["git"] + argv, capture_output=True, check=True)
+        return subprocess.run(
+            ["git"] + argv,
+            capture_output=True,
+            check=True,
+            text=True,
+            **kwargs
+        )
 
-    def summarize (diff: list[str]):
+    def options (config: io.TextIOBase):
+        """Get the options set in a given config, except compiler versions."""
+        return dict(
+            m.groups()
+            for m in map(_CONFIG_RE.match, config)
+            if m and "CC_VERSION" not in m[1]
+        )
+
+    def summarize (before: dict[str, str], after: dict[str, str]):
         """Generate the summary of changed options."""
-        def startswith (ch):
-            return dict([
-                x[1:].split("=", maxsplit=1)
-                for x in diff
-                if x.startswith(ch + "CONFIG") and "CC_VERSION" not in x
-            ])
-        additions = startswith("+")
-        deletions = startswith("-")
+        additions = {k: v for k, v in after.items() if k not in before}
+        deletions = {k: v for k, v in before.items() if k not in after}
         changes = {
-            k: (deletions[k], additions[k])
-            for k in additions.keys() & deletions.keys()
+            k: (before[k], v)
+            for k, v in after.items()
+            if k in before and before[k] != v
         }
-        additions = {k: v for k, v in additions.items() if k not in changes}
-        deletions = {k: v for k, v in deletions.items() if k not in changes}
         if additions:
             msg.write("\nenabled:\n")
             for opt, val in additions.items():
@@ -736,32 +925,7 @@ def commit (argv):
             for opt, val in deletions.items():
                 msg.write(f"* {opt}\n")
 
-    parser = argparse.ArgumentParser(
-        prog="ekernel-commit",
-        description="Commit the current kernel config.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-m",
-        metavar="<msg>",
-        dest="msg",
-        type=str,
-        default="",
-        help="additional information for the commit message"
-    )
-    parser.add_argument(
-        "-n",
-        dest="dry",
-        action="store_true",
-        help="perform a dry run (show what would be commited)"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
+    args = _commit_parser.parse_args(argv)
     out.quiet = args.quiet
 
     # get the kernel under /usr/src/linux
@@ -774,41 +938,47 @@ def commit (argv):
     # change to source directory
     os.chdir(kernel.src)
 
-    # ensure that we're in a git repository
+    # get git root directory (ensuring that we're in a git repository)
     try:
-        git(["status", "-s"])
+        gitroot = pathlib.Path(
+            git(["rev-parse", "--show-toplevel"]).stdout.strip()
+        )
     except subprocess.CalledProcessError as e:
-        raise RuntimeError(e.stderr.decode().strip())
+        raise RuntimeError(e.stderr.strip())
+
+    # get status of tracked files (XY <path>, relative to the git root)
+    status = git(["status", "--porcelain", "-uno"]).stdout.splitlines()
 
     # ensure that nothing is staged
-    try:
-        git(["diff", "--cached", "--exit-code", "--quiet"])
-    except subprocess.CalledProcessError as e:
+    if any(l[0] != " " for l in status):
         raise RuntimeError("please commit or stash staged changes")
 
-    # get git root directory
-    gitroot = pathlib.Path(
-        git(["rev-parse", "--show-toplevel"]).stdout.decode().strip()
-    )
-
     # add unstaged config removals
     removals = [
-        gitroot / (l.rsplit(maxsplit=1)[1])
-        for l in
-            git(["-P", "diff", "--name-status"]).stdout.decode().splitlines()
-        if l.startswith("D") and "usr/src/linux" in l and ".config" in l
+        gitroot / l[3:]
+        for l in status
+        if l[1] == "D" and "usr/src/linux" in l and ".config" in l
     ]
-    for r in removals: git(["rm", r])
+    if removals: git(["rm", "--"] + removals)
 
     config_changed = True
 
+    # get status of the current config (empty if tracked and unchanged),
+    # regardless of the repository's status.showUntrackedFiles setting
+    config_status = git([
+        "status",
+        "--porcelain",
+        "--ignored",
+        "--untracked-files=all",
+        "--",
+        kernel.config
+    ]).stdout[:2]
+
     # check if current config is tracked already
-    try:
-        git(["ls-files", "--error-unmatch", kernel.config])
+    if config_status not in {"??", "!!"}:
 
         # config is tracked: check for changes
-        try:
-            git(["-P", "diff", "--exit-code", "--quiet", kernel.config])
+        if not config_status:
 
             # config hasn't changed: only removals remain
             config_changed = False
@@ -817,16 +987,16 @@ def commit (argv):
                 if args.msg: msg.write(f"\n\n{args.msg}")
 
         # config changed
-        except subprocess.CalledProcessError:
+        else:
             git(["add", "-f", kernel.config])
             msg.write("updated kernel config\n")
             if args.msg: msg.write(f"\n{args.msg}\n")
-            summarize(
-                git(["diff", kernel.config]).stdout.decode().splitlines()
-            )
+            head = git(["show", f"HEAD:./{kernel.config.name}"]).stdout
+            with kernel.config.open() as f:
+                summarize(options(io.StringIO(head)), options(f))
 
     # config isn't tracked: kernel has been updated
-    except subprocess.CalledProcessError:
+    else:
         git(["add", "-f", kernel.config])
 
         # /usr/src/linux/.config.old (previous config stored by make oldconfig)
@@ -860,14 +1030,12 @@ def commit (argv):
             if newoptions.exists():
                 msg.write("\nnew:\n")
                 with newoptions.open() as f:
-                    for opt in f.readlines():
-                        msg.write(f"* {opt.replace('=', ' = ')}")
+                    for m in filter(None, map(_CONFIG_RE.match, f)):
+                        msg.write(f"* {m[1]} = {m[2]}\n")
 
             # append summary
-            summarize(list(difflib.unified_diff(
-                oldconfig.read_text().splitlines(),
-                kernel.config.read_text().splitlines()
-            )))
+            with oldconfig.open() as old, kernel.config.open() as new:
+                summarize(options(old), options(new))
         else:
             msg.write(f"{kernel.version}")
             if args.msg: msg.write(f"\n\n{args.msg}")
@@ -894,63 +1062,46 @@ def commit (argv):
     # commit
     try:
         out.ebegin("committing")
-        ret = git(["commit", "-m", msg.getvalue()])
+        ret = git(["commit", "-F", "-"], input=msg.getvalue())
         out.eend(0)
     except subprocess.CalledProcessError as e:
         out.eend(1)
-        raise RuntimeError(e.stderr.decode())
+        raise RuntimeError(e.stderr)
+
+# ekernel command line arguments
+_update_parser = argparse.ArgumentParser(
+    prog="ekernel",
+    description="Custom Gentoo EFI stub kernel updater.",
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    parents=[_jobs, _source, _quiet]
+)
+_update_parser.add_argument(
+    "-b",
+    dest="bkp",
+    action="store_true",
+    help="create fallback boot entry"
+)
+_update_parser.add_argument(
+    "-k",
+    metavar="<keep>",
+    dest="keep",
+    type=int,
+    help="keep the previous <num> bootable kernels (default: 1)"
+)
+_update_parser.add_argument(
+    "-m",
+    metavar="<msg>",
+    dest="msg",
+    type=str,
+    help="additional information for the commit message"
+)
 
 @cli
 def update (argv):
     """Custom Gentoo EFI stub kernel updater."""
-    parser = argparse.ArgumentParser(
-        prog="ekernel",
-        description="Custom Gentoo EFI stub kernel updater.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    parser.add_argument(
-        "-j",
-        metavar="<jobs>",
-        dest="jobs",
-        type=int,
-        help=f"number of parallel make jobs (default: {jobs})"
-    )
-    parser.add_argument(
-        "-s",
-        metavar="<src>",
-        dest="src",
-        type=pathlib.Path,
-        help="kernel source directory (default: latest)"
-    )
-    parser.add_argument(
-        "-b",
-        dest="bkp",
-        action="store_true",
-        help="create fallback boot entry"
-    )
-    parser.add_argument(
-        "-k",
-        metavar="<keep>",
-        dest="keep",
-        type=int,
-        help="keep the previous <num> bootable kernels (default: 1)"
-    )
-    parser.add_argument(
-        "-m",
-        metavar="<msg>",
-        dest="msg",
-        type=str,
-        help="additional information for the commit message"
-    )
-    parser.add_argument(
-        "-q",
-        dest="quiet",
-        action="store_true",
-        help="be quiet"
-    )
-    args = parser.parse_args(argv)
-    args.jobs = ["-j", str(args.jobs)] if args.jobs else []
-    args.src = ["-s", str(args.src)] if args.src else []
+    args = _update_parser.parse_args(argv)
+    args.jobs = ["-j", str(args.jobs)]
+    args.src = ["-s", str(args.src or Kernel.latest().src)]
     args.bkp = ["-b"] if args.bkp else []
     args.keep = ["-k", str(args.keep)] if args.keep is not None else []
     args.msg = ["-m", args.msg] if args.msg else []
@@ -958,6 +1109,6 @@ def update (argv):
 
     configure(args.quiet + args.src)
     build(args.quiet + args.jobs + args.src)
-    install(args.quiet + args.bkp + args.src)
+    install(args.quiet + args.bkp + args.jobs + args.src)
     clean(args.quiet + args.keep)
     commit(args.quiet + args.msg)
@@ -1,46 +1,51 @@
+import contextlib
 import functools
 import io
+import os
 import subprocess
-import sys
 
 import portage.output
-from pkgutil import resolve_name as resolve
+from pkgutil import resolve_name
 
 import ekernel
 
+# memoized name resolution (intercepted functions share few parents)
+resolve = functools.cache(resolve_name)
+
 # disable output
 ekernel.out.quiet = True
 
+# git identity of test repositories (saves configuring each of them)
+os.environ.update({
+    "GIT_AUTHOR_NAME": "some body",
+    "GIT_AUTHOR_EMAIL": "some@e.mail",
+    "GIT_COMMITTER_NAME": "some body",
+    "GIT_COMMITTER_EMAIL": "some@e.mail"
+})
+
 def git (argv: list[str]):
     return subprocess.run(["git"] + argv, capture_output=True, check=True)
 
-def capture_stdout (f):
-    """A decorator for capturing stdout in a io.StringIO object."""
-    @functools.wraps(f)
-    def capture (*args, **kwargs):
-        quiet = ekernel.out.quiet
-        ekernel.out.quiet = False
-        stdout = sys.stdout
-        sys.stdout = io.StringIO()
-        r = f(*args, **kwargs)
-        sys.stdout = stdout
-        ekernel.out.quiet = quiet
-        return r
-    return capture
-
-def capture_stderr (f):
-    """A decorator for capturing stderr in a io.StringIO object."""
-    @functools.wraps(f)
-    def capture (*args, **kwargs):
-        quiet = ekernel.out.quiet
-        ekernel.out.quiet = False
-        stderr = sys.stderr
-        sys.stderr = io.StringIO()
-        r = f(*args, **kwargs)
-        sys.stderr = stderr
-        ekernel.out.quiet = quiet
-        return r
-    return capture
+def capture (redirect):
+    """Create a decorator capturing output through a given redirector."""
+    def decorator (f):
+        @functools.wraps(f)
+        def capture (*args, **kwargs):
+            quiet = ekernel.out.quiet
+            ekernel.out.quiet = False
+            try:
+                with redirect(io.StringIO()):
+                    return f(*args, **kwargs)
+            finally:
+                ekernel.out.quiet = quiet
+        return capture
+    return decorator
+
+# decorator for capturing stdout in a io.StringIO object
+capture_stdout = capture(contextlib.redirect_stdout)
+
+# decorator for capturing stderr in a io.StringIO object
+capture_stderr = capture(contextlib.redirect_stderr)
 
 def colorless (f):
     """A decorator for disabling portage's colorful output."""
@@ -48,9 +53,10 @@ def colorless (f):
     def nocolor (*args, **kwargs):
         havecolor = portage.output.havecolor
         portage.output.havecolor = 0
-        r = f(*args, **kwargs)
-        portage.output.havecolor = havecolor
-        return r
+        try:
+            return f(*args, **kwargs)
+        finally:
+            portage.output.havecolor = havecolor
     return nocolor
 
 class Interceptor:
@@ -58,20 +64,25 @@ class Interceptor:
 
     class Tracer:
 
+        __slots__ = ("name", "parent", "interceptor", "target", "log", "call")
+
         def __init__ (self, interceptor, target, log, call):
             self.name = f"{target.__module__}.{target.__qualname__}"
             self.parent = resolve(self.name.rsplit(".", 1)[0])
             self.interceptor = interceptor
             self.target = target
             self.log = log
-            self.call = call
+            self.call = call if callable(call) else None
 
         def start (self):
+            # resolve everything needed per call upfront
+            append = self.interceptor.trace.append if self.log else None
+            replacement = self.call
             def call (*args, **kwargs):
-                if self.log:
-                    self.interceptor.trace.append((self, (args, kwargs)))
-                if callable(self.call):
-                    return self.call(self, *args, **kwargs)
+                if append:
+                    append((self, args, kwargs))
+                if replacement:
+                    return replacement(self, *args, **kwargs)
             setattr(self.parent, self.target.__name__, call)
 
         def stop (self):
@@ -82,14 +93,12 @@ class Interceptor:
         self.trace = []
 
     def __str__ (self):
-        s = io.StringIO()
-        for tracer, (args, kwargs) in self.trace:
-            s.write(f"{tracer.name}\n")
-            for a in args:
-                s.write(f"  {a}\n")
-            for k, v in kwargs.items():
-                s.write(f"  {k} = {v}\n")
-        return s.getvalue()
+        return "".join(
+            f"{tracer.name}\n"
+            + "".join(f"  {a}\n" for a in args)
+            + "".join(f"  {k} = {v}\n" for k, v in kwargs.items())
+            for tracer, args, kwargs in self.trace
+        )
 
     def add (self, target, log=True, call=None):
         """
@@ -1,5 +1,6 @@
 """Setup the kernel test environment."""
 import functools
+import os
 import pathlib
 import shutil
 import subprocess
@@ -7,10 +8,16 @@ import tempfile
 
 import ekernel
 
-# create temporary directory
-tmpdir = tempfile.TemporaryDirectory()
+# create temporary directory (in memory, if possible)
+tmpdir = tempfile.TemporaryDirectory(
+    dir="/dev/shm" if os.path.isdir("/dev/shm") else None
+)
 tmp = pathlib.Path(tmpdir.name)
 
+# pristine copy of a prepared test environment
+templatedir = tempfile.TemporaryDirectory(dir=tmp.parent)
+template = pathlib.Path(templatedir.name)
+
 # kernel source directory
 src = tmp / "usr/src"
 
@@ -20,7 +27,7 @@ linux = src / "linux"
 # kernel module directory
 modules = tmp / "lib/modules"
 
-# EFI system partition (/boot -> /tmp)
+# EFI system partition (/boot -> tmp's top level directory, e.g. /tmp)
 esp = tmp.parents[-2]
 
 # boot image
@@ -49,6 +56,8 @@ oldconfig = f"""\
 # Automatically generated file; DO NOT EDIT.
 # Linux/x86 {current}-gentoo Kernel Configuration
 #
+CONFIG_CC_VERSION_TEXT="gcc (Gentoo 11.2.1 p1) 11.2.1"
+CONFIG_GCC_VERSION=110201
 CONFIG_A=y
 CONFIG_B=y
 CONFIG_C=y
@@ -63,6 +72,8 @@ CONFIG_F=n
 
 # new config
 newconfig = """\
+CONFIG_CC_VERSION_TEXT="gcc (Gentoo 11.3.0 p4) 11.3.0"
+CONFIG_GCC_VERSION=110300
 CONFIG_A=y
 CONFIG_C=m
 CONFIG_D=y
@@ -83,7 +94,6 @@ def efi (f):
                 "Boot0002* Gentoo (ignore)\tHD()/\\EFI\\Gentoo\\ignore.efi\n"
                 "Boot0003* Gentoo (fallback)\tHD()/"
                     f"\\EFI\\Gentoo\\{kernels[2].bkp.name}\n"
-                .encode()
             )
         elif args[0][0] == "mount":
             ekernel.efi.esp = esp
@@ -96,13 +106,14 @@ def efi (f):
 def setup ():
     """Setup the kernel test environment."""
     # remove any existing files
-    for p in tmp.glob("*"):
-        shutil.rmtree(p)
+    shutil.rmtree(tmp)
+    tmp.mkdir()
 
     # change Kernel paths
     ekernel.Kernel.src = src
     ekernel.Kernel.linux = linux
     ekernel.Kernel.modules = modules
+    ekernel.Kernel._invalidate()
 
     # change EFI paths
     ekernel.efi.esp = esp
@@ -130,3 +141,14 @@ def setup ():
 
     # symlink to old source directory
     linux.symlink_to(current)
+
+def snapshot ():
+    """Save the current test environment as template."""
+    shutil.rmtree(template)
+    shutil.copytree(tmp, template, symlinks=True)
+
+def restore ():
+    """Reset the test environment to the last snapshot."""
+    shutil.rmtree(tmp)
+    shutil.copytree(template, tmp, symlinks=True)
+    ekernel.Kernel._invalidate()
@@ -5,7 +5,6 @@ import subprocess
 import sys
 import unittest
 
-from ekernel import Kernel
 from test import capture_stdout, colorless, Interceptor
 import test.data.kernel as data
 
@@ -43,33 +42,30 @@ class Tests (unittest.TestCase):
         self.interceptor.stop()
 
     def check_clean (self, keep=2):
-        trace_it = iter(self.interceptor.trace)
-        # efibootmgr
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["efibootmgr"],))
-        self.assertEqual(kwargs, {"capture_output": True, "check": True})
-        # mount /boot
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["mount", "/boot"],))
-        self.assertEqual(kwargs, {"capture_output": True, "check": True})
-        # emerge -cq gentoo-sources
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["emerge", "-q", "-c", "gentoo-sources"],))
-        self.assertEqual(kwargs, {"check": True})
+        # expected subprocess.run calls
+        captured = {"capture_output": True, "check": True, "text": True}
+        calls = [
+            # efibootmgr
+            (["efibootmgr"], captured),
+            # mount /boot
+            (["mount", "/boot"], captured),
+            # emerge -cq gentoo-sources
+            (["emerge", "-q", "-c", "gentoo-sources"], {"check": True})
+        ]
         if keep < 3:
             # efibootmgr -b 0003 -B
-            tracer, (args, kwargs) = next(trace_it)
-            self.assertEqual(tracer.name, "subprocess.run")
-            self.assertEqual(args, (["efibootmgr", "-q", "-b", "0003", "-B"],))
-            self.assertEqual(kwargs, {"check": True})
+            calls.append(
+                (["efibootmgr", "-q", "-b", "0003", "-B"], {"check": True})
+            )
         # umount /boot
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["umount", "/tmp"],))
-        self.assertEqual(kwargs, {"check": True})
+        calls.append((["umount", str(data.esp)], {"check": True}))
+        self.assertEqual(
+            [
+                (tracer.name, args, kwargs)
+                for tracer, args, kwargs in self.interceptor.trace
+            ],
+            [("subprocess.run", (args,), kwargs) for args, kwargs in calls]
+        )
         # check files
         for k in data.kernels[:keep]:
             self.assertTrue(k.src.exists())
@@ -110,9 +106,9 @@ class Tests (unittest.TestCase):
     def test_clean_umount_on_error (self):
         with self.assertRaises(SystemExit):
             run("-h")
-        tracer, (args, kwargs) = self.interceptor.trace[-1]
+        tracer, args, kwargs = self.interceptor.trace[-1]
         self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["umount", "/tmp"],))
+        self.assertEqual(args, (["umount", str(data.esp)],))
         self.assertEqual(kwargs, {"check": True})
 
     @colorless
@@ -134,3 +130,26 @@ class Tests (unittest.TestCase):
                 expected.write(f"   ✗ {p}\n")
         expected.write(" * deleting boot entry Gentoo (fallback)\n")
         self.assertEqual(sys.stdout.getvalue(), expected.getvalue())
+
+    @colorless
+    @capture_stdout
+    def test_clean_dry_run_order (self):
+        # leftovers of a kernel whose source is already gone
+        modules = data.modules / "5.15.10-gentoo"
+        modules.mkdir()
+        bkp = data.boot.parent / "gentoo-5.15.10.efi"
+        bkp.touch()
+        self.assertEqual(run("-n"), 0)
+        kernels = data.kernels[2:]
+        rm = {
+            "sources": [k.src for k in kernels],
+            "modules": [modules] + [k.modules for k in kernels],
+            "images": [bkp] + [k.bkp for k in kernels]
+        }
+        expected = io.StringIO()
+        for k, v in rm.items():
+            expected.write(f" * deleting {k}:\n")
+            for p in v:
+                expected.write(f"   ✗ {p}\n")
+        expected.write(" * deleting boot entry Gentoo (fallback)\n")
+        self.assertEqual(sys.stdout.getvalue(), expected.getvalue())
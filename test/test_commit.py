@@ -15,21 +15,27 @@ def run (*argv):
 
 class Tests (unittest.TestCase):
 
-    def setUp (self):
+    @classmethod
+    def setUpClass (cls):
         # setup test environment
         data.setup()
-        self.current = Kernel.current()
-        self.latest = Kernel.latest()
         # update src symlink to new kernel
         data.linux.unlink()
         data.linux.symlink_to(data.latest)
         # initialize git repository
         os.chdir(data.tmp)
         git(["init"])
-        git(["config", "user.email", "some@e.mail"])
-        git(["config", "user.name", "some body"])
-        git(["add", "-f", self.current.config])
+        git(["add", "-f", Kernel(data.current).config])
         git(["commit", "-m", "initial"])
+        # restored before each test
+        data.snapshot()
+
+    def setUp (self):
+        # restore test environment
+        data.restore()
+        os.chdir(data.tmp)
+        self.current = Kernel(data.current)
+        self.latest = Kernel.latest()
         # additional files
         self.oldconfig = data.latest / ".config.old"
         self.newoptions = data.latest / ".newoptions"
@@ -43,8 +49,8 @@ class Tests (unittest.TestCase):
     def check_commit (self, msg):
         # check message
         self.assertEqual(
-            git(["log", "-1", "--pretty=%B"]).stdout.decode(),
-            msg
+            git(["log", "-1", "--pretty=%B"]).stdout,
+            msg.encode()
         )
         # check if config has been commited
         self.assertEqual(
@@ -78,6 +84,12 @@ class Tests (unittest.TestCase):
             "\n"
         )
 
+    def test_commit_untracked_hidden (self):
+        # common setup for a repository rooted at /
+        git(["config", "status.showUntrackedFiles", "no"])
+        (data.tmp / ".gitignore").write_text("*\n")
+        self.test_commit()
+
     def test_commit_message (self):
         self.assertEqual(run("-q", "-m", "details"), 0)
         self.check_commit(
@@ -138,6 +150,34 @@ class Tests (unittest.TestCase):
         self.assertEqual(run("-q", "-m", "details"), 0)
         self.check_commit("removed old kernel leftovers\n\ndetails\n\n")
 
+    def test_commit_changed_config (self):
+        self.latest.config.write_text(data.newconfig)
+        self.oldconfig.unlink()
+        self.newoptions.unlink()
+        git(["add", "-f", self.latest.config])
+        git(["commit", "-m", "update", self.latest.config])
+        self.latest.config.write_text(
+            data.newconfig
+                .replace("CONFIG_A=y", "CONFIG_A=n")
+                .replace("CONFIG_F=y\n", "CONFIG_G=y\n")
+        )
+        self.assertEqual(run("-q", "-m", "details"), 0)
+        self.check_commit(
+            "updated kernel config\n"
+            "\n"
+            "details\n"
+            "\n"
+            "enabled:\n"
+            "* CONFIG_G = y\n"
+            "\n"
+            "changed:\n"
+            "* CONFIG_A = y → n\n"
+            "\n"
+            "removed:\n"
+            "* CONFIG_F\n"
+            "\n"
+        )
+
     @colorless
     @capture_stderr
     def test_commit_missing_repository (self):
@@ -199,8 +239,8 @@ class Tests (unittest.TestCase):
             "   * CONFIG_B\n"
         )
         self.assertEqual(
-            git(["log", "-1", "--pretty=%B"]).stdout.decode(),
-            "initial\n\n"
+            git(["log", "-1", "--pretty=%B"]).stdout,
+            b"initial\n\n"
         )
 
     @colorless
@@ -220,6 +260,6 @@ class Tests (unittest.TestCase):
             "   details\n"
         )
         self.assertEqual(
-            git(["log", "-1", "--pretty=%B"]).stdout.decode(),
-            "test\n\n"
+            git(["log", "-1", "--pretty=%B"]).stdout,
+            b"test\n\n"
         )
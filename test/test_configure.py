@@ -1,4 +1,4 @@
-import pathlib
+import os
 import subprocess
 import sys
 import unittest
@@ -20,13 +20,20 @@ class Tests (unittest.TestCase):
         self.kernel.newoptions = self.kernel.src / ".newoptions"
 
     def setUp (self):
+        # output and exit status of make listnewconfig
+        self.newoptions = data.newoptions
+        self.returncode = 0
         # start interceptor
         self.interceptor = Interceptor()
         def run (tracer, *args, **kwargs):
             if args[0][0] == "make":
                 if args[0][1] == "listnewconfig":
-                    make = subprocess.CompletedProcess("", 0)
-                    make.stdout = data.newoptions.encode()
+                    make = subprocess.CompletedProcess(
+                        args[0],
+                        self.returncode,
+                        self.newoptions
+                    )
+                    if kwargs.get("check"): make.check_returncode()
                     return make
                 elif args[0][1] == "menuconfig":
                     self.kernel.config.touch()
@@ -36,6 +43,7 @@ class Tests (unittest.TestCase):
         self.interceptor.start()
         # setup test environment
         data.setup()
+        self.current = Kernel.current()
         self.set_kernel(Kernel.latest())
 
     def tearDown (self):
@@ -44,19 +52,22 @@ class Tests (unittest.TestCase):
 
     def check_list (self):
         # make listnewconfig
-        tracer, (args, kwargs) = self.interceptor.trace[0]
+        tracer, args, kwargs = self.interceptor.trace[0]
         self.assertEqual(tracer.name, "subprocess.run")
         self.assertEqual(args, (["make", "listnewconfig"],))
-        self.assertEqual(kwargs, {"capture_output": True})
+        self.assertEqual(
+            kwargs,
+            {"capture_output": True, "check": True, "text": True}
+        )
         self.assertTrue(self.kernel.newoptions.exists())
 
     def check_oldconfig (self):
-        self.assertEqual(pathlib.Path.cwd(), self.kernel.src)
+        self.assertEqual(os.getcwd(), os.fspath(self.kernel.src))
         # make listnewconfig
         self.check_list()
         self.assertTrue(self.kernel.config.exists())
         # make oldconfig
-        tracer, (args, kwargs) = self.interceptor.trace[1]
+        tracer, args, kwargs = self.interceptor.trace[1]
         self.assertEqual(tracer.name, "subprocess.run")
         self.assertEqual(args, (["make", "oldconfig"],))
         self.assertEqual(kwargs, {"check": True})
@@ -64,9 +75,9 @@ class Tests (unittest.TestCase):
         self.assertTrue(self.kernel.oldconfig.exists())
 
     def check_menuconfig (self):
-        self.assertEqual(pathlib.Path.cwd(), self.kernel.src)
+        self.assertEqual(os.getcwd(), os.fspath(self.kernel.src))
         # make menuconfig
-        tracer, (args, kwargs) = self.interceptor.trace[0]
+        tracer, args, kwargs = self.interceptor.trace[0]
         self.assertEqual(tracer.name, "subprocess.run")
         self.assertEqual(args, (["make", "menuconfig"],))
         self.assertEqual(kwargs, {"check": True})
@@ -85,8 +96,23 @@ class Tests (unittest.TestCase):
         self.assertEqual(run("-l"), 0)
         self.check_list()
         self.assertEqual(sys.stdout.getvalue(),
-            f" * copying {Kernel.current().config}\n"
+            f" * copying {self.current.config}\n"
+            " * running make listnewconfig\n"
+            "CONFIG_D = n\n"
+            "CONFIG_E = n\n"
+            "CONFIG_F = n\n"
+        )
+
+    @colorless
+    @capture_stdout
+    def test_configure_list_newopts_compiler_version (self):
+        self.newoptions = "CONFIG_CC_VERSION_TEXT=\"gcc\"\n" + data.newoptions
+        self.assertEqual(run("-l"), 0)
+        self.check_list()
+        self.assertEqual(sys.stdout.getvalue(),
+            f" * copying {self.current.config}\n"
             " * running make listnewconfig\n"
+            "CONFIG_CC_VERSION_TEXT = \"gcc\"\n"
             "CONFIG_D = n\n"
             "CONFIG_E = n\n"
             "CONFIG_F = n\n"
@@ -98,7 +124,7 @@ class Tests (unittest.TestCase):
         self.assertEqual(run("-l"), 0)
         self.check_list()
         self.assertEqual(sys.stdout.getvalue(),
-            f" * copying {Kernel.current().config}\n"
+            f" * copying {self.current.config}\n"
             " * running make listnewconfig\n"
             "CONFIG_D = n\n"
             "CONFIG_E = n\n"
@@ -118,7 +144,7 @@ class Tests (unittest.TestCase):
     @colorless
     @capture_stderr
     def test_configure_list_newopts_missing_oldconfig_missing (self):
-        Kernel.current().config.unlink()
+        self.current.config.unlink()
         with self.assertRaises(SystemExit):
             run("-l")
         self.assertEqual(sys.stderr.getvalue(),
@@ -131,11 +157,47 @@ class Tests (unittest.TestCase):
         self.assertEqual(run(), 0)
         self.check_oldconfig()
         self.assertEqual(sys.stdout.getvalue(),
-            f" * copying {Kernel.current().config}\n"
+            f" * copying {self.current.config}\n"
             " * running make listnewconfig\n"
             " * running make oldconfig\n"
         )
 
+    @colorless
+    @capture_stdout
+    def test_configure_oldconfig_no_newopts (self):
+        self.newoptions = ""
+        self.assertEqual(run(), 0)
+        self.check_list()
+        self.assertEqual(len(self.interceptor.trace), 1)
+        self.assertEqual(
+            self.kernel.oldconfig.read_text(),
+            self.current.config.read_text()
+        )
+        self.assertEqual(sys.stdout.getvalue(),
+            f" * copying {self.current.config}\n"
+            " * running make listnewconfig\n"
+            " * skipping make oldconfig (no new options)\n"
+        )
+
+    @colorless
+    @capture_stdout
+    @capture_stderr
+    def test_configure_oldconfig_listnewconfig_failed (self):
+        self.returncode = 2
+        with self.assertRaises(SystemExit):
+            run()
+        self.assertEqual(len(self.interceptor.trace), 1)
+        self.assertFalse(self.kernel.oldconfig.exists())
+        self.assertFalse(self.kernel.newoptions.exists())
+        self.assertEqual(sys.stdout.getvalue(),
+            f" * copying {self.current.config}\n"
+            " * running make listnewconfig\n"
+        )
+        self.assertEqual(sys.stderr.getvalue(),
+            " * Command '['make', 'listnewconfig']' returned non-zero exit"
+            " status 2.\n"
+        )
+
     @colorless
     @capture_stdout
     def test_configure_oldconfig_older_version (self):
@@ -155,7 +217,7 @@ class Tests (unittest.TestCase):
     @colorless
     @capture_stdout
     def test_configure_old_missing (self):
-        Kernel.current().config.unlink()
+        self.current.config.unlink()
         run()
         self.check_menuconfig()
         self.assertEqual(sys.stdout.getvalue(), " * running make menuconfig\n")
@@ -168,7 +230,7 @@ class Tests (unittest.TestCase):
         self.check_oldconfig()
         self.assertEqual(sys.stdout.getvalue(),
             f" * deleting {self.kernel.config}\n"
-            f" * copying {Kernel.current().config}\n"
+            f" * copying {self.current.config}\n"
             " * running make listnewconfig\n"
             " * running make oldconfig\n"
         )
@@ -177,7 +239,7 @@ class Tests (unittest.TestCase):
     @capture_stdout
     def test_reconfigure_menuconfig (self):
         self.kernel.config.touch()
-        Kernel.current().config.unlink()
+        self.current.config.unlink()
         run("-d")
         self.check_menuconfig()
         self.assertEqual(sys.stdout.getvalue(),
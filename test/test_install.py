@@ -1,11 +1,10 @@
-import pathlib
 import platform
 import subprocess
 import sys
 import unittest
 
 from ekernel import Kernel
-from test import capture_stderr, Interceptor
+from test import capture_stdout, capture_stderr, Interceptor
 import test.data.kernel as data
 
 import ekernel
@@ -21,11 +20,13 @@ class Tests (unittest.TestCase):
         self.kernel = Kernel.latest()
         self.kernel.bzImage.touch()
         self.current = Kernel.current()
+        self.jobs = "4"
+        self.source, self.disk, self.part = "/dev/sda1\n", "/dev/sda", "1"
         # start interceptor
         @data.efi
         def run (tracer, *args, **kwargs):
             if args[0][0] == "findmnt":
-                return subprocess.CompletedProcess("", 0, b"/dev/sda1")
+                return subprocess.CompletedProcess("", 0, self.source)
             elif args[0][0] == "eselect":
                 data.linux.unlink()
                 data.linux.symlink_to(self.kernel.src.name)
@@ -40,80 +41,100 @@ class Tests (unittest.TestCase):
         # stop interceptor
         self.interceptor.stop()
 
-    def check_install (self, backup=False):
-        trace_it = iter(self.interceptor.trace)
-        # efibootmgr
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["efibootmgr"],))
-        self.assertEqual(kwargs, {"capture_output": True, "check": True})
-        # mount <boot>
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["mount", "/boot"],))
-        self.assertEqual(kwargs, {"capture_output": True, "check": True})
-        # eselect kernel set <name>
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(
-            args,
-            (["eselect", "kernel", "set", self.kernel.src.name],)
-        )
-        self.assertEqual(kwargs, {"check": True})
-        self.assertEqual(str(data.linux.readlink()), self.kernel.src.name)
-        # make modules_install
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["make", "modules_install", ">/dev/null"],))
-        self.assertEqual(kwargs, {"check": True})
-        # emerge @module-rebuild
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["emerge", "-q", "@module-rebuild"],))
-        self.assertEqual(kwargs, {"check": True})
+    def check_install (self, backup=False, missing=False):
+        # expected calls
+        captured = {"capture_output": True, "check": True, "text": True}
+        calls = [
+            # efibootmgr
+            ("subprocess.run", (["efibootmgr"],), captured),
+            # mount <boot>
+            ("subprocess.run", (["mount", "/boot"],), captured)
+        ]
+        if missing:
+            # platform.release
+            calls.append(("platform.release", (), {}))
+        calls += [
+            # eselect kernel set <name>
+            (
+                "subprocess.run",
+                (["eselect", "kernel", "set", self.kernel.src.name],),
+                {"check": True}
+            ),
+            # make modules_install
+            (
+                "subprocess.run",
+                (["make", "-j", self.jobs, "modules_install"],),
+                {"check": True, "stdout": subprocess.DEVNULL}
+            ),
+            # emerge @module-rebuild
+            (
+                "subprocess.run",
+                (["emerge", "-q", "@module-rebuild"],),
+                {"check": True}
+            )
+        ]
         if backup:
-            if data.boot.read_bytes() == b"missing image":
-                # platform.release
-                tracer, (args, kwargs) = next(trace_it)
-                self.assertEqual(tracer.name, "platform.release")
-            # findmnt -rno SOURCE <boot>
-            tracer, (args, kwargs) = next(trace_it)
-            self.assertEqual(tracer.name, "subprocess.run")
-            self.assertEqual(args, (["findmnt", "-rno", "SOURCE", "/tmp"],))
-            self.assertEqual(kwargs, {"capture_output": True, "check": True})
-            # efibootmgr -b 0003 -B
-            tracer, (args, kwargs) = next(trace_it)
-            self.assertEqual(tracer.name, "subprocess.run")
-            self.assertEqual(args, (["efibootmgr", "-q", "-b", "0003", "-B"],))
-            self.assertEqual(kwargs, {"check": True})
-            # efibootmgr -c -d <disk> -p <part> -L <label> -l <loader>
-            tracer, (args, kwargs) = next(trace_it)
-            self.assertEqual(tracer.name, "subprocess.run")
             loader = self.current.bkp.parts
             loader = "\\" + "\\".join(loader[loader.index("EFI"):])
-            self.assertEqual(args, ([
-                "efibootmgr",
-                "-q",
-                "-c",
-                "-d", "/dev/sda",
-                "-p", "1",
-                "-L", "Gentoo (fallback)",
-                "-l", loader
-            ],))
-            self.assertEqual(kwargs, {"check": True})
+            calls += [
+                # findmnt -rno SOURCE <boot>
+                (
+                    "subprocess.run",
+                    (["findmnt", "-rno", "SOURCE", str(data.esp)],),
+                    captured
+                ),
+                # efibootmgr -b 0003 -B
+                (
+                    "subprocess.run",
+                    (["efibootmgr", "-q", "-b", "0003", "-B"],),
+                    {"check": True}
+                ),
+                # efibootmgr -c -d <disk> -p <part> -L <label> -l <loader>
+                (
+                    "subprocess.run",
+                    ([
+                        "efibootmgr",
+                        "-q",
+                        "-c",
+                        "-d", self.disk,
+                        "-p", self.part,
+                        "-L", "Gentoo (fallback)",
+                        "-l", loader
+                    ],),
+                    {"check": True}
+                )
+            ]
         # umount <boot>
-        tracer, (args, kwargs) = next(trace_it)
-        self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["umount", "/tmp"],))
-        self.assertEqual(kwargs, {"check": True})
+        calls.append(
+            ("subprocess.run", (["umount", str(data.esp)],), {"check": True})
+        )
+        self.assertEqual(
+            [
+                (tracer.name, args, kwargs)
+                for tracer, args, kwargs in self.interceptor.trace
+            ],
+            calls
+        )
+        self.assertEqual(str(data.linux.readlink()), self.kernel.src.name)
         # check generated files
         self.assertTrue(ekernel.efi.img.exists())
+        self.assertFalse(ekernel.efi.img.with_suffix(".tmp").exists())
         self.assertTrue(self.kernel.bkp.exists())
 
     def test_install (self):
         self.assertEqual(run("-q"), 0)
         self.check_install()
 
+    def test_install_jobs (self):
+        self.jobs = "128"
+        self.assertEqual(run("-q", "-j", self.jobs), 0)
+        self.check_install()
+
+    @capture_stderr
+    def test_install_jobs_illegal (self):
+        with self.assertRaises(SystemExit):
+            run("-j", "foo")
+
     def test_install_source (self):
         self.kernel = Kernel.current()
         self.assertEqual(run("-q", "-s", str(data.current)), 0)
@@ -123,12 +144,32 @@ class Tests (unittest.TestCase):
         self.assertEqual(run("-q", "-b"), 0)
         self.check_install(backup=True)
 
+    def test_install_backup_nvme (self):
+        self.source, self.disk = "/dev/nvme0n1p1\n", "/dev/nvme0n1"
+        self.assertEqual(run("-q", "-b"), 0)
+        self.check_install(backup=True)
+
     def test_install_backup_missing_image (self):
         self.current.bkp.unlink()
         self.kernel.bzImage.write_bytes(b"missing image")
         self.assertEqual(run("-q", "-b"), 0)
-        self.check_install(backup=True)
-        self.assertTrue(self.current.bkp.exists())
+        self.check_install(backup=True, missing=True)
+        self.assertEqual(
+            self.current.bkp.read_bytes(),
+            str(self.current.bkp).encode()
+        )
+
+    @capture_stdout
+    @capture_stderr
+    def test_install_failed_image (self):
+        # boot image can't be replaced
+        ekernel.efi.img.mkdir()
+        (ekernel.efi.img / "foo").touch()
+        with self.assertRaises(SystemExit):
+            run()
+        self.assertRegex(sys.stderr.getvalue(), r"Is a directory")
+        self.assertFalse(ekernel.efi.img.with_suffix(".tmp").exists())
+        self.assertFalse(self.kernel.bkp.exists())
 
     @capture_stderr
     def test_install_missing_bzImage (self):
@@ -136,7 +177,7 @@ class Tests (unittest.TestCase):
         with self.assertRaises(SystemExit):
             run("-s", str(data.latest))
         self.assertRegex(sys.stderr.getvalue(), r"missing.*bzImage")
-        tracer, (args, kwargs) = self.interceptor.trace[-1]
+        tracer, args, kwargs = self.interceptor.trace[-1]
         self.assertEqual(tracer.name, "subprocess.run")
-        self.assertEqual(args, (["umount", "/tmp"],))
+        self.assertEqual(args, (["umount", str(data.esp)],))
         self.assertEqual(kwargs, {"check": True})
@@ -52,7 +52,7 @@ class Tests (unittest.TestCase):
     def test_trace (self):
         def test ():
             Foo().bar(argv)
-            tracer, (args, kwargs) = self.interceptor.trace[-1]
+            tracer, args, kwargs = self.interceptor.trace[-1]
             self.assertEqual(tracer.name, "subprocess.run")
             self.assertEqual(tracer.log, True)
             self.assertEqual(tracer.call, None)
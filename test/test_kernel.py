@@ -3,14 +3,15 @@ import unittest
 
 from packaging.version import Version
 
-from test import Interceptor
 import test.data.kernel as data
 
 import ekernel
 
 class Tests (unittest.TestCase):
 
-    def setUp (self):
+    @classmethod
+    def setUpClass (cls):
+        # tests only read the environment, unless they restore it afterwards
         data.setup()
 
     def check_vars (self, k, s):
@@ -48,6 +49,24 @@ class Tests (unittest.TestCase):
             list(reversed(data.kernels))
         )
 
+    def test_kernel_list_dirs_only (self):
+        self.addCleanup(data.setup)
+        (data.src / "linux-5.15.24-gentoo.tar.xz").touch()
+        ekernel.Kernel._invalidate()
+        self.assertEqual(ekernel.Kernel.list(), data.kernels)
+
+    def test_kernel_list_cached (self):
+        self.addCleanup(data.setup)
+        kernels = ekernel.Kernel.list()
+        kernels.pop()
+        (data.src / "linux-5.15.24-gentoo").mkdir()
+        self.assertEqual(ekernel.Kernel.list(), data.kernels)
+        ekernel.Kernel._invalidate()
+        self.assertEqual(
+            ekernel.Kernel.list()[0].src,
+            data.src / "linux-5.15.24-gentoo"
+        )
+
     def test_kernel_current (self):
         self.check_vars(ekernel.Kernel.current(), data.current)
 
@@ -67,7 +86,18 @@ class Tests (unittest.TestCase):
         self.assertFalse(ekernel.Kernel.latest().bootable())
         self.assertTrue(ekernel.Kernel.current().bootable())
 
+    def test_kernel_current_missing_symlink (self):
+        self.addCleanup(data.setup)
+        data.linux.unlink()
+        with self.assertRaises(ValueError) as e:
+            ekernel.Kernel.current()
+        self.assertEqual(
+            str(e.exception),
+            f"error: missing source {data.linux}"
+        )
+
     def test_kernel_current_missing (self):
+        self.addCleanup(data.setup)
         kernel = ekernel.Kernel.current()
         shutil.rmtree(kernel.src)
         with self.assertRaises(ValueError) as e:
@@ -14,35 +14,41 @@ def run (*argv):
 
 class Tests (unittest.TestCase):
 
-    def setUp (self):
+    @classmethod
+    def setUpClass (cls):
         # setup test environment
         data.setup()
-        self.latest = Kernel.latest()
-        self.oldconfig = data.latest / ".config.old"
         # initialize git repository
         os.chdir(data.tmp)
         git(["init"])
-        git(["config", "user.email", "some@e.mail"])
-        git(["config", "user.name", "some body"])
         git(["add", "-f", Kernel.current().config])
         git(["commit", "-m", "initial"])
+        # restored before each test
+        data.snapshot()
+
+    def setUp (self):
+        # restore test environment
+        data.restore()
+        os.chdir(data.tmp)
+        self.latest = Kernel.latest()
+        self.oldconfig = data.latest / ".config.old"
         # start interceptor
         @data.efi
         def run (tracer, *args, **kwargs):
             if args[0][0] == "findmnt":
-                return subprocess.CompletedProcess("", 0, b"/dev/sda1")
+                return subprocess.CompletedProcess("", 0, "/dev/sda1")
             elif args[0][0] == "make":
                 if args[0][1] == "listnewconfig":
                     make = subprocess.CompletedProcess("", 0)
-                    make.stdout = data.newoptions.encode()
+                    make.stdout = data.newoptions
                     return make
                 elif args[0][1] == "oldconfig":
                     self.latest.config.write_text(data.newconfig)
                     self.oldconfig.write_text(data.oldconfig)
+                elif args[0][-1] == "modules_install":
+                    self.latest.modules.mkdir(parents=True)
                 elif args[0][1] == "-j":
                     self.latest.bzImage.touch()
-                elif args[0][1] == "modules_install":
-                    self.latest.modules.mkdir(parents=True)
             elif args[0][0] == "eselect":
                 data.linux.unlink()
                 data.linux.symlink_to(data.latest)
@@ -55,8 +61,8 @@ class Tests (unittest.TestCase):
     def check_update (self):
         self.assertEqual(
             len([
-                x for x in self.interceptor.trace
-                if "mount" in x[1][0][0][0]
+                args for tracer, args, kwargs in self.interceptor.trace
+                if "mount" in args[0][0]
             ]),
             2
         )